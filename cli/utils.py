@@ -4,9 +4,9 @@ from copy import deepcopy
 from itertools import product
 from pathlib import Path
 from typing import Union
-from urllib.request import urlopen
 
 import click
+import requests
 from tqdm import tqdm
 
 from cli.config import read_config
@@ -88,32 +88,25 @@ def parse_args(args):
     return dict(zip(keys, vals))
 
 
-def download_url(url: str, output_path: Union[Path, str]):
+def download_url(url: str, output_path: Union[Path, str], chunk_size: int = 1 << 20):
     """download url
 
-    Download from url to give output path and visualize using tqdm.
+    Stream from url to given output path in chunks and visualize using tqdm.
 
     Args:
         url (str): url to download
         output_path (Union[Path, str]): path to download file to
+        chunk_size (int): bytes read from the response per write
     """
-    u = urlopen(url)
-    h = u.info()
-    totalSize = int(h["Content-Length"])
-
-    fp = open(output_path, "wb")
-
-    blockSize = 8192
-    with tqdm(total=totalSize) as pbar:
-        while True:
-            chunk = u.read(blockSize)
-            if not chunk:
-                break
-            fp.write(chunk)
-            pbar.update(blockSize)
-
-    fp.flush()
-    fp.close()
+    with requests.get(url, stream=True) as r:
+        r.raise_for_status()
+        totalSize = int(r.headers.get("Content-Length", 0))
+        with open(output_path, "wb") as fp, tqdm(
+            total=totalSize, unit="B", unit_scale=True
+        ) as pbar:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                fp.write(chunk)
+                pbar.update(len(chunk))
 
 
 def fetch_auth(func):
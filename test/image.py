@@ -0,0 +1,98 @@
+import numpy as np
+from scipy import ndimage as ndi
+from skimage import measure
+
+from zpy.image import outer_contours
+
+
+def _contours(mask):
+    """Contours of a padded mask, found the same way as in seg_to_annotations."""
+    mask = np.pad(mask, 1)
+    return measure.find_contours(mask, 0.01, positive_orientation="low")
+
+
+def _area(contour):
+    rows, cols = contour[:, 0], contour[:, 1]
+    return abs(0.5 * np.sum(rows[:-1] * cols[1:] - rows[1:] * cols[:-1]))
+
+
+def test_ring_keeps_outer_contour():
+    mask = np.zeros((20, 20), dtype=bool)
+    mask[2:18, 2:18] = True
+    mask[6:14, 6:14] = False
+    contours = _contours(mask)
+    assert len(contours) == 2
+    outer = outer_contours(contours, np.pad(mask, 1))
+    assert len(outer) == 1
+    assert _area(outer[0]) == max(_area(c) for c in contours)
+
+
+def test_island_in_hole_is_dropped():
+    mask = np.zeros((20, 20), dtype=bool)
+    mask[2:18, 2:18] = True
+    mask[5:15, 5:15] = False
+    mask[8:12, 8:12] = True
+    contours = _contours(mask)
+    assert len(contours) == 3
+    outer = outer_contours(contours, np.pad(mask, 1))
+    assert len(outer) == 1
+    filled = _contours(ndi.binary_fill_holes(mask))
+    assert np.allclose(_area(outer[0]), _area(filled[0]))
+
+
+def test_separate_blobs_are_kept():
+    mask = np.zeros((20, 30), dtype=bool)
+    mask[2:10, 2:10] = True
+    mask[5:15, 15:25] = True
+    contours = _contours(mask)
+    outer = outer_contours(contours, np.pad(mask, 1))
+    assert len(outer) == 2
+    # Original contour order is preserved
+    assert all(a is b for a, b in zip(outer, contours))
+
+
+def test_many_blobs():
+    # Grid of separate squares, half of them sitting inside the holes of rings
+    mask = np.zeros((400, 400), dtype=bool)
+    for r in range(0, 400, 20):
+        for c in range(0, 400, 20):
+            if (r // 20 + c // 20) % 2:
+                mask[r + 2 : r + 18, c + 2 : c + 18] = True
+                mask[r + 5 : r + 15, c + 5 : c + 15] = False
+            mask[r + 8 : r + 12, c + 8 : c + 12] = True
+    contours = _contours(mask)
+    assert len(contours) == 800
+    outer = outer_contours(contours, np.pad(mask, 1))
+    assert len(outer) == 400
+    filled = _contours(ndi.binary_fill_holes(mask))
+    assert sorted(_area(c) for c in outer) == sorted(_area(c) for c in filled)
+
+
+def test_diagonal_hole_counts_as_outside():
+    """A hole touching the outside only diagonally is not filled.
+
+    binary_fill_holes (4-connected background) would fill it, while
+    find_contours treats the background as 8-connected, so the outer
+    contour wraps into the hole and encloses a smaller area.
+    """
+    mask = np.array(
+        [
+            [0, 1, 1, 1],
+            [1, 0, 1, 1],
+            [1, 1, 1, 1],
+        ],
+        dtype=bool,
+    )
+    outer = outer_contours(_contours(mask), np.pad(mask, 1))
+    assert len(outer) == 1
+    filled = _contours(ndi.binary_fill_holes(mask))
+    assert len(filled) == 1
+    assert _area(outer[0]) < _area(filled[0])
+
+
+if __name__ == "__main__":
+    test_ring_keeps_outer_contour()
+    test_island_in_hole_is_dropped()
+    test_separate_blobs_are_kept()
+    test_many_blobs()
+    test_diagonal_hole_counts_as_outside()
@@ -1,8 +1,10 @@
+import atexit
+import copy
 import functools
 import json
 import sys
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Union
 
@@ -19,11 +21,14 @@ from zpy.client_util import (
     auth_header,
     clear_last_print,
     is_done,
+    make_session,
 )
 
 _auth_token: str = ""
 _base_url: str = ""
 _project: Union[Dict, None] = None
+_session: Union[requests.Session, None] = None
+_executor: Union[ThreadPoolExecutor, None] = None
 
 
 def init(
@@ -32,14 +37,19 @@ def init(
     base_url: str = "https://ragnarok.zumok8s.org",
     **kwargs,
 ):
-    global _auth_token, _base_url, _project
+    global _auth_token, _base_url, _project, _session
     _auth_token = auth_token
     _base_url = base_url
+    _session = make_session()
+    # Auth header only changes here, so set it once for every request on the session
+    _session.headers.update(auth_header(_auth_token))
+    # Cached lookups may belong to another environment or token
+    _fetch_sim.cache_clear()
 
     try:
         _project = get(
             f"{_base_url}/api/v1/projects/{project_uuid}",
-            headers=auth_header(_auth_token),
+            session=_session,
         ).json()
     except requests.HTTPError:
         print(
@@ -48,7 +58,17 @@ def init(
         )
 
 
+def _get_executor() -> ThreadPoolExecutor:
+    """Lazily create the thread pool used to issue independent API calls concurrently."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=4)
+        atexit.register(_executor.shutdown, wait=False)
+    return _executor
+
+
 IMAGES_PER_SAMPLE = 2  # for the iseg and rbg
+POLL_INTERVAL_SECONDS = 60  # between dataset state checks in generate
 
 
 def require_zpy_init(func):
@@ -61,6 +81,38 @@ def require_zpy_init(func):
     return wrapper
 
 
+@functools.lru_cache(maxsize=128)
+def _fetch_sim(project_id: str, sim_name: str) -> Dict:
+    """Fetch the unique Sim with a given name in a Project. Cached per arguments.
+
+    Args:
+        project_id: Id of the Project the Sim belongs to
+        sim_name: Name of Sim
+    Returns:
+        dict: The Sim
+    Raises:
+        RuntimeError: No Sim or more than one Sim matches
+    """
+    unique_sim_filters = {
+        "project": project_id,
+        "name": sim_name,
+    }
+    sims = get(
+        f"{_base_url}/api/v1/sims/",
+        params=unique_sim_filters,
+        session=_session,
+    ).json()["results"]
+    if len(sims) > 1:
+        raise RuntimeError(
+            f"Create DatasetConfig failed: Found more than 1 Sim for unique filters which should not be possible."
+        )
+    elif len(sims) == 0:
+        raise RuntimeError(
+            f"Create DatasetConfig failed: Could not find Sim<{sim_name}> in Project<{_project['name']}>."
+        )
+    return sims[0]
+
+
 class DatasetConfig:
     @require_zpy_init
     def __init__(self, sim_name: str, **kwargs):
@@ -70,29 +122,11 @@ class DatasetConfig:
         Args:
             sim_name: Name of Sim
         """
-        self._sim = None
         self._config = {}
-
-        unique_sim_filters = {
-            "project": _project["id"],
-            "name": sim_name,
-        }
-        sims = get(
-            f"{_base_url}/api/v1/sims/",
-            params=unique_sim_filters,
-            headers=auth_header(_auth_token),
-        ).json()["results"]
-        if len(sims) > 1:
-            raise RuntimeError(
-                f"Create DatasetConfig failed: Found more than 1 Sim for unique filters which should not be possible."
-            )
-        elif len(sims) == 1:
-            print(f"Found Sim<{sim_name}> in Project<{_project['name']}>")
-            self._sim = sims[0]
-        else:
-            raise RuntimeError(
-                f"Create DatasetConfig failed: Could not find Sim<{sim_name}> in Project<{_project['name']}>."
-            )
+        self._config_query_param_value = None
+        # Copy so callers mutating the Sim cannot alter the cached lookup
+        self._sim = copy.deepcopy(_fetch_sim(_project["id"], sim_name))
+        print(f"Found Sim<{sim_name}> in Project<{_project['name']}>")
 
     @property
     def sim(self):
@@ -104,9 +138,19 @@ class DatasetConfig:
 
     @property
     def config(self):
-        """A dict representing a json object of gin config parameters."""
+        """A dict representing a json object of gin config parameters.
+
+        Use set and unset to change the config, mutating this dict directly is not supported.
+        """
         return self._config
 
+    @property
+    def config_query_param_value(self):
+        """The config as a query parameter value string. Cached until the config is set or unset."""
+        if self._config_query_param_value is None:
+            self._config_query_param_value = to_query_param_value(self._config)
+        return self._config_query_param_value
+
     def set(self, path: str, value: any):
         """Set a value for a configurable parameter.
 
@@ -115,6 +159,7 @@ class DatasetConfig:
             value: The value for the gin config path provided.
         """
         set_(self._config, path, value)
+        self._config_query_param_value = None
 
     def unset(self, path):
         """Remove a configurable parameter.
@@ -123,6 +168,7 @@ class DatasetConfig:
             See self.set
         """
         unset(self._config, path)
+        self._config_query_param_value = None
 
 
 @add_newline
@@ -141,7 +187,7 @@ def preview(dataset_config: DatasetConfig, num_samples=10):
     config_filters = (
         {}
         if is_empty(dataset_config.config)
-        else {"config": to_query_param_value(dataset_config.config)}
+        else {"config": dataset_config.config_query_param_value}
     )
     filter_params = {
         "project": _project["id"],
@@ -153,7 +199,7 @@ def preview(dataset_config: DatasetConfig, num_samples=10):
     simruns_res = get(
         f"{_base_url}/api/v1/simruns/",
         params=filter_params,
-        headers=auth_header(_auth_token),
+        session=_session,
     )
     simruns = simruns_res.json()["results"]
 
@@ -170,7 +216,7 @@ def preview(dataset_config: DatasetConfig, num_samples=10):
     files_res = get(
         f"{_base_url}/api/v1/files/",
         params=file_query_params,
-        headers=auth_header(_auth_token),
+        session=_session,
     )
     files = files_res.json()["results"]
     if len(files) == 0:
@@ -203,7 +249,7 @@ def generate(
             "project": _project["id"],
             "name": name,
         },
-        headers=auth_header(_auth_token),
+        session=_session,
     ).json()
     post(
         f"{_base_url}/api/v1/datasets/{dataset['id']}/generate/",
@@ -213,7 +259,7 @@ def generate(
             "config": json.dumps(dataset_config.config),
             "amount": num_datapoints,
         },
-        headers=auth_header(_auth_token),
+        session=_session,
     )
 
     print("Generating dataset:")
@@ -221,46 +267,53 @@ def generate(
 
     if materialize:
         print("Materialize requested, waiting until dataset finishes to download it.")
-        dataset = get(
-            f"{_base_url}/api/v1/datasets/{dataset['id']}/",
-            headers=auth_header(_auth_token),
-        ).json()
-        while not is_done(dataset["state"]):
-            all_simruns_query_params = {"datasets": dataset["id"]}
-            num_simruns = get(
-                f"{_base_url}/api/v1/simruns/",
+        dataset_url = f"{_base_url}/api/v1/datasets/{dataset['id']}/"
+        simruns_url = f"{_base_url}/api/v1/simruns/"
+        # Only the count is read, so keep the returned page as small as possible
+        all_simruns_query_params = {"datasets": dataset["id"], "page-size": 1}
+        executor = _get_executor()
+        while True:
+            # Dataset state and SimRun counts are independent, fetch them concurrently
+            dataset_future = executor.submit(get, dataset_url, session=_session)
+            num_simruns_future = executor.submit(
+                get,
+                simruns_url,
                 params=all_simruns_query_params,
-                headers=auth_header(_auth_token),
-            ).json()["count"]
-            num_ready_simruns = get(
-                f"{_base_url}/api/v1/simruns/",
+                session=_session,
+            )
+            num_ready_simruns_future = executor.submit(
+                get,
+                simruns_url,
                 params={**all_simruns_query_params, "state": "READY"},
-                headers=auth_header(_auth_token),
-            ).json()["count"]
-            next_check_datetime = datetime.now() + timedelta(seconds=60)
-            while datetime.now() < next_check_datetime:
-                print(
-                    "\r{}".format(
-                        f"Dataset<{dataset['name']}> not ready for download in state {dataset['state']}. "
-                        f"SimRuns READY: {num_ready_simruns}/{num_simruns}. "
-                        f"Checking again in {(next_check_datetime - datetime.now()).seconds}s."
-                    ),
-                    end="",
-                )
-                time.sleep(1)
+                session=_session,
+            )
+            dataset = dataset_future.result().json()
+            if is_done(dataset["state"]):
+                # Counts are only needed for the status line. Cancel them; any already
+                # in flight finish in the background and their result or error is ignored.
+                num_simruns_future.cancel()
+                num_ready_simruns_future.cancel()
+                break
+            num_simruns = num_simruns_future.result().json()["count"]
+            num_ready_simruns = num_ready_simruns_future.result().json()["count"]
+            print(
+                "\r{}".format(
+                    f"Dataset<{dataset['name']}> not ready for download in state {dataset['state']}. "
+                    f"SimRuns READY: {num_ready_simruns}/{num_simruns}. "
+                    f"Checking again in {POLL_INTERVAL_SECONDS}s."
+                ),
+                end="",
+            )
+            time.sleep(POLL_INTERVAL_SECONDS)
 
             clear_last_print()
             print("\r{}".format("Checking dataset...", end=""))
-            dataset = get(
-                f"{_base_url}/api/v1/datasets/{dataset['id']}/",
-                headers=auth_header(_auth_token),
-            ).json()
 
         if dataset["state"] == "READY":
             print("Dataset is ready for download.")
             dataset_download_res = get(
                 f"{_base_url}/api/v1/datasets/{dataset['id']}/download/",
-                headers=auth_header(_auth_token),
+                session=_session,
             ).json()
             name_slug = f"{dataset['name'].replace(' ', '_')}-{dataset['id'][:8]}.zip"
             # Throw it in /tmp for now I guess
@@ -302,7 +355,7 @@ class Dataset:
             datasets = get(
                 f"{_base_url}/api/v1/datasets/",
                 params=unique_dataset_filters,
-                headers=auth_header(_auth_token),
+                session=_session,
             ).json()["results"]
             self._dataset = datasets[0]
 
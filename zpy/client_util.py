@@ -4,6 +4,8 @@ import sys
 
 import requests
 from requests import HTTPError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 def add_newline(func):
@@ -29,6 +31,26 @@ def auth_header(auth_token):
     return {"Authorization": f"Token {auth_token}"}
 
 
+def make_session():
+    """Create a requests.Session which keeps connections alive between API calls.
+
+    Returns:
+        requests.Session
+    """
+    session = requests.Session()
+    # Hand the last response back after retries so handle_response can raise HTTPError
+    retries = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 def handle_response(response: requests.Response):
     """Shared logic for handling API responses.
 
@@ -47,12 +69,13 @@ def handle_response(response: requests.Response):
     return response
 
 
-def get(url, **kwargs):
+def get(url, session: requests.Session = None, **kwargs):
     """GET a url. Forwards kwargs to requests.get
     TODO: Merge with calling code in zpy/cli/
 
     Args:
         url (str): Ragnarok API url
+        session (requests.Session): Optional session to reuse connections from
         kwargs: Forwarded to the requests.get function call
     Returns:
         requests.Response
@@ -60,25 +83,26 @@ def get(url, **kwargs):
         HTTPError
     """
     verbose = kwargs.pop("verbose", False)
-    response = requests.get(url, **kwargs)
+    response = (session or requests).get(url, **kwargs)
     if verbose:
         print(response.url)
     return handle_response(response)
 
 
-def post(url, **kwargs):
+def post(url, session: requests.Session = None, **kwargs):
     """POST to a url. Forwards kwargs to requests.post
     TODO: Merge with calling code in zpy/cli/
 
     Args:
         url (str): Ragnarok API url
+        session (requests.Session): Optional session to reuse connections from
         kwargs: Forwarded to the requests.post function call
     Returns:
          requests.Response
     Raises:
         HTTPError
     """
-    return handle_response(requests.post(url, **kwargs))
+    return handle_response((session or requests).post(url, **kwargs))
 
 
 def to_query_param_value(config):
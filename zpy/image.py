@@ -2,7 +2,6 @@
     Image utilties.
 """
 import logging
-from itertools import groupby
 from pathlib import Path
 from typing import Dict, List, Union
 
@@ -10,8 +9,7 @@ import numpy as np
 from PIL import Image
 from scipy import ndimage as ndi
 from shapely.geometry import MultiPolygon, Polygon
-from skimage import color, exposure, img_as_uint, io, measure
-from skimage.morphology import binary_closing, binary_opening
+from skimage import img_as_uint, io, measure
 from skimage.transform import resize
 
 import gin
@@ -22,11 +20,13 @@ log = logging.getLogger(__name__)
 
 def open_image(
     image_path: Union[Path, str],
+    normalize: bool = True,
 ) -> np.ndarray:
     """Open image from path to ndarray.
 
     Args:
         image_path (Union[Path, str]): Path to image.
+        normalize (bool, optional): Scale 0 to 255 pixel values to floats (0 to 1). Defaults to True.
 
     Returns:
         np.ndarray: Image as numpy array.
@@ -38,7 +38,7 @@ def open_image(
         if img.shape[2] > 3:
             log.debug("RGBA image detected!")
             img = img[:, :, :3]
-        if img.max() > 2.0:
+        if normalize and img.max() > 2.0:
             img = np.divide(img, 255.0)
     except Exception as e:
         log.error(f"Error {e} when opening {image_path}")
@@ -51,9 +51,12 @@ def remove_alpha_channel(image_path: Union[Path, str]) -> None:
     Args:
         image_path (Union[Path, str]): Path to image.
     """
-    img = open_image(image_path)
-    io.imsave(image_path, img)
-    log.info(f"Saving image with no alpha channel at {image_path}")
+    image_path = zpy.files.verify_path(image_path, make=False)
+    # Slice the native pixel values, no float round trip needed
+    img = io.imread(image_path)
+    if img.ndim == 3 and img.shape[2] > 3:
+        io.imsave(image_path, img[:, :, :3])
+        log.info(f"Saving image with no alpha channel at {image_path}")
 
 
 @gin.configurable
@@ -147,14 +150,24 @@ def flatten_images(
     Returns:
         List[np.ndarray]: List of flattened images.
     """
-    flat_images = []
+    images = [image for image in images if np.ndim(image) == 3]
+    # Fill a single preallocated array instead of concatenating reshaped copies
+    num_pixels = sum(image.shape[0] * image.shape[1] for image in images)
+    flat_images = np.empty(
+        (num_pixels, images[0].shape[2]), dtype=np.result_type(*images)
+    )
+    offset = 0
     for image in images:
-        dims = np.shape(image)
-        if len(dims) == 3:
-            flat_images.append(np.reshape(image, (dims[0] * dims[1], dims[2])))
-    flat_images = np.concatenate(flat_images, axis=0)
-    subsample = flat_images[np.random.randint(flat_images.shape[0], size=max_pixels), :]
-    return [subsample]
+        image_pixels = image.shape[0] * image.shape[1]
+        flat_images[offset : offset + image_pixels] = image.reshape(image_pixels, -1)
+        offset += image_pixels
+    # Subsample pixels without replacement. The Generator avoids the full permutation
+    # done by np.random.choice, and is seeded from the global (seedable) random state.
+    rng = np.random.default_rng(np.random.randint(2 ** 32, dtype=np.int64))
+    subsample_idx = rng.choice(
+        num_pixels, size=min(max_pixels, num_pixels), replace=False
+    )
+    return [flat_images[subsample_idx]]
 
 
 def pad_with(vector, pad_width, iaxis, kwargs):
@@ -174,14 +187,68 @@ def binary_mask_to_rle(binary_mask) -> Dict:
     """
     binary_mask = np.asfortranarray(binary_mask)
     rle = {"counts": [], "size": list(binary_mask.shape)}
-    counts = rle.get("counts")
-    for i, (value, elements) in enumerate(groupby(binary_mask.ravel(order="F"))):
-        if i == 0 and value == 1:
-            counts.append(0)
-        counts.append(len(list(elements)))
+    flat_mask = binary_mask.ravel(order="F")
+    if flat_mask.size == 0:
+        return rle
+    # Runs start wherever the value changes from the previous pixel
+    run_starts = np.flatnonzero(flat_mask[1:] != flat_mask[:-1]) + 1
+    run_bounds = np.concatenate(([0], run_starts, [flat_mask.size]))
+    counts = np.diff(run_bounds).tolist()
+    # Counts always start with a run of zeros (which may be empty)
+    if flat_mask[0] == 1:
+        counts.insert(0, 0)
+    rle["counts"] = counts
     return rle
 
 
+def outer_contours(
+    contours: List[np.ndarray],
+    binary_mask: np.ndarray,
+) -> List[np.ndarray]:
+    """Keep only the outermost contours from skimage.measure.find_contours.
+
+    Expects contours found on binary_mask with positive_orientation="low", where outer
+    boundaries have a negative signed area in (row, col) space and hole boundaries a
+    positive one. Outer boundaries of blobs sitting inside another blob's hole are
+    dropped as well. Nesting is read from connected component labels (4-connected
+    foreground, 8-connected background, as find_contours treats them), so the cost
+    is linear in image size and number of contours.
+
+    Unlike contouring after ndi.binary_fill_holes (which uses a 4-connected
+    background), a hole touching the outside only diagonally counts as outside,
+    so the outer contour wraps into it.
+
+    Args:
+        contours (List[np.ndarray]): Closed (row, col) contours.
+        binary_mask (np.ndarray): Mask the contours were found on, with a background border.
+
+    Returns:
+        List[np.ndarray]: Outermost contours.
+    """
+    # Background connected to the image border is the outside
+    background_labels, _ = ndi.label(~binary_mask, structure=np.ones((3, 3)))
+    outside = background_labels == background_labels[0, 0]
+    # Blobs with a pixel next to the outside are not nested in any hole
+    foreground_labels, num_blobs = ndi.label(binary_mask)
+    is_outer_blob = np.zeros(num_blobs + 1, dtype=bool)
+    is_outer_blob[foreground_labels[ndi.binary_dilation(outside) & binary_mask]] = True
+    outer = []
+    for contour in contours:
+        rows, cols = contour[:, 0], contour[:, 1]
+        signed_area = 0.5 * np.sum(rows[:-1] * cols[1:] - rows[1:] * cols[:-1])
+        if signed_area >= 0:
+            continue
+        # A contour vertex sits on the edge between a foreground and a background
+        # pixel, nearest the background one, which gives the blob it outlines
+        vertex = contour[0]
+        pixel = np.floor(vertex).astype(int)
+        frac = vertex - pixel
+        pixel += (frac > 0) & (frac < 0.5)
+        if is_outer_blob[foreground_labels[pixel[0], pixel[1]]]:
+            outer.append(contour)
+    return outer
+
+
 @gin.configurable
 def seg_to_annotations(
     image_path: Union[Path, str],
@@ -207,52 +274,75 @@ def seg_to_annotations(
     """
     log.info(f"Extracting annotations from segmentation: {image_path}")
     image_path = zpy.files.verify_path(image_path, make=False)
-    img = open_image(image_path)
+    # Only the discrete colors matter, so skip the float conversion
+    img = open_image(image_path, normalize=False)
     img_height, img_width = img.shape[0], img.shape[1]
-    # Unique colors represent each unique category
-    unique_colors = np.unique(img.reshape(-1, img.shape[2]), axis=0)
+    # Unique colors represent each unique category, the inverse indices
+    # give a label map of which unique color each pixel belongs to
+    if img.dtype == np.uint8 and img.shape[2] == 3:
+        # Pack each color into a single uint32 key (keeps the r, g, b sort order)
+        # so np.unique does a flat sort instead of a row-wise one
+        img_keys = (
+            (img[:, :, 0].astype(np.uint32) << 16)
+            | (img[:, :, 1].astype(np.uint32) << 8)
+            | img[:, :, 2]
+        )
+        unique_keys, label_map = np.unique(img_keys, return_inverse=True)
+        unique_colors = np.stack(
+            [unique_keys >> 16, unique_keys >> 8, unique_keys], axis=-1
+        ).astype(np.uint8)
+    else:
+        unique_colors, label_map = np.unique(
+            img.reshape(-1, img.shape[2]), axis=0, return_inverse=True
+        )
+    label_map = label_map.reshape(img_height, img_width)
     # Store bboxes, seg polygons, and area in annotations list
     annotations = []
     # Loop through each category
     if unique_colors.shape[0] > max_categories:
         raise ValueError(f"Over {max_categories} categories: {unique_colors.shape[0]}")
+    # Morphology footprint and scratch buffer shared by every category
+    footprint = ndi.generate_binary_structure(2, 1)
+    morph_buffer = np.empty((img_height, img_width), dtype=bool)
+    # Divisors for normalizing each (x, y) segmentation coordinate
+    coords_scale = np.array([img_height, img_width])
     for i in range(unique_colors.shape[0]):
         seg_color = unique_colors[i, :]
         log.debug(f"Unique color {seg_color}")
         if all(np.equal(seg_color, np.zeros(3))):
             log.debug("Color is background.")
             continue
-        # Make an image mask for this category
-        masked_image = img.copy()
-        mask = (img != seg_color).any(axis=-1)
-        masked_image[mask] = np.zeros(3)
-        masked_image = color.rgb2gray(masked_image)
+        # Make a binary image mask for this category
+        masked_image = label_map == i
         if log.getEffectiveLevel() == logging.DEBUG:
             masked_image_name = (
                 str(image_path.stem) + f"_masked_{i}" + str(image_path.suffix)
             )
             masked_image_path = image_path.parent / masked_image_name
-            io.imsave(
-                masked_image_path, img_as_uint(exposure.rescale_intensity(masked_image))
-            )
+            io.imsave(masked_image_path, img_as_uint(masked_image))
+        # Binary opening (erosion then dilation), reusing the preallocated buffer.
+        # Erosion treats the border as foreground to match skimage.morphology.
+        ndi.binary_erosion(
+            masked_image, structure=footprint, output=morph_buffer, border_value=1
+        )
+        ndi.binary_dilation(morph_buffer, structure=footprint, output=masked_image)
         if remove_salt:
-            # Remove "salt"
+            # Remove "salt" with a binary closing (dilation then erosion)
             # https://scikit-image.org/docs/dev/api/skimage.morphology
-            masked_image = binary_opening(masked_image)
-            masked_image = binary_closing(masked_image)
-        else:
-            masked_image = binary_opening(masked_image)
+            ndi.binary_dilation(masked_image, structure=footprint, output=morph_buffer)
+            ndi.binary_erosion(
+                morph_buffer, structure=footprint, output=masked_image, border_value=1
+            )
         # HACK: Pad masked image so segmented objects that extend beyond
         #       image are properly contoured
         masked_image = np.pad(masked_image, 1, pad_with, padder=False)
         # RLE encoded segmentation from binary image
         if rle_segmentations:
             rle_segmentation = binary_mask_to_rle(masked_image)
-        # Fill in the holes
-        filled_masked_image = ndi.binary_fill_holes(masked_image)
-        # Get countours for each blob
-        contours = measure.find_contours(
-            filled_masked_image, 0.01, positive_orientation="low"
+        # Get countours for each blob, ignoring holes
+        contours = outer_contours(
+            measure.find_contours(masked_image, 0.01, positive_orientation="low"),
+            masked_image,
         )
         log.debug(f"found {len(contours)} contours for {seg_color} in {image_path}")
         # HACK: Sometimes all you get is salt for an image, in this case
@@ -269,22 +359,15 @@ def seg_to_annotations(
         for contour in contours:
             # Flip from (row, col) representation to (x, y)
             # and subtract the padding pixel
-            for j in range(len(contour)):
-                row, col = contour[j]
-                contour[j] = (col - 1, row - 1)
+            contour = contour[:, ::-1] - 1
             # Make a polygon and simplify it
             poly = Polygon(contour)
             poly = poly.simplify(1.0, preserve_topology=True)
             polygons.append(poly)
             # Segmentation
-            segmentation = np.array(poly.exterior.coords).ravel().tolist()
-            segmentations.append(segmentation)
-            segmentations_float.append(
-                [
-                    x / img_height if k % 2 == 0 else x / img_width
-                    for k, x in enumerate(segmentation)
-                ]
-            )
+            coords = np.asarray(poly.exterior.coords)
+            segmentations.append(coords.ravel().tolist())
+            segmentations_float.append((coords / coords_scale).ravel().tolist())
             # Bounding boxes
             x, y, max_x, max_y = poly.bounds
             bbox = (x, y, max_x - x, max_y - y)
@@ -312,7 +395,8 @@ def seg_to_annotations(
         ]
         area_float = area / (img_width * img_height)
         annotation = {
-            "color": tuple(seg_color),
+            # Float rgb (0 to 1) to match colors stored by the saver
+            "color": tuple(np.divide(seg_color, 255.0)),
             # COCO standards
             "segmentation": segmentations,
             "bbox": bbox,